@@ -1,30 +1,167 @@
+# /// script
+# dependencies = ["pyarrow"]
+# ///
+
 import csv
+import glob
+import mmap
+import os
+import re
 import sys
 from collections import defaultdict
-from collections.abc import Generator
+from collections.abc import Generator, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from itertools import repeat
+from operator import itemgetter
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = None
+
+try:
+    from fastnumbers import float as parse_float
+except ImportError:
+    parse_float = float
 
+CSV_BLOCK_SIZE = 8 << 20
+# A line with an odd number of quotes opens a quoted field that spans lines.
+ODD_QUOTE_LINE = re.compile(rb'^[^"\n]*"(?:[^"\n]*"[^"\n]*")*[^"\n]*$', re.M)
 
-def read_csv_rows(filepath: str) -> Generator[dict[str, str], None, None]:
-    """Reads a CSV file and yields each row as a dictionary.
+
+def read_csv_rows(
+    filepath: str,
+) -> Generator[tuple[str, str, str], None, None]:
+    """Reads a CSV file and yields the transaction columns of each row.
 
     Args:
         filepath (str): The path to the CSV file.
 
     Yields:
-        dict[str, str]: A dictionary representing a row from the CSV file.
+        tuple[str, str, str]: The 'date', 'memo' and 'amount' values of a row
+            from the CSV file.
     """
     with open(filepath, newline="", encoding="utf-8") as csvfile:
-        yield from csv.DictReader(csvfile)
+        reader = csv.reader(csvfile)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = itemgetter(
+            header.index("date"), header.index("memo"), header.index("amount")
+        )
+        yield from map(columns, reader)
+
+
+def read_candidate_rows(
+    filepath: str, keyword: str
+) -> Generator[tuple[str, str, str], None, None]:
+    """Yields the transaction columns of rows whose line contains keyword.
+
+    The file is memory-mapped and scanned for the keyword natively, so only
+    candidate lines are decoded and parsed. The memo column still has to be
+    checked by the caller. Non-ASCII keywords and files with quoted fields
+    spanning lines fall back to reading every row.
+
+    Args:
+        filepath (str): The path to the CSV file.
+        keyword (str): The string to search for, ignoring case.
+
+    Yields:
+        tuple[str, str, str]: The 'date', 'memo' and 'amount' values of a
+            candidate row from the CSV file.
+    """
+    if not keyword.isascii():
+        yield from read_csv_rows(filepath)
+        return
+
+    search = re.compile(re.escape(keyword.encode()), re.IGNORECASE).search
+    with open(filepath, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm.find(b'"') >= 0 and ODD_QUOTE_LINE.search(mm):
+                yield from read_csv_rows(filepath)
+                return
+            header_end = mm.find(b"\n")
+            if header_end < 0:
+                return
+            header = next(csv.reader([mm[:header_end].decode("utf-8")]))
+            columns = itemgetter(
+                header.index("date"),
+                header.index("memo"),
+                header.index("amount"),
+            )
+
+            def candidate_lines() -> Generator[str, None, None]:
+                match = search(mm, header_end + 1)
+                while match:
+                    start = mm.rfind(b"\n", 0, match.start()) + 1
+                    end = mm.find(b"\n", match.end())
+                    if end < 0:
+                        end = len(mm)
+                    yield mm[start:end].decode("utf-8")
+                    match = search(mm, end + 1)
+
+            yield from map(columns, csv.reader(candidate_lines()))
+
+
+def read_csv_batches(filepath: str) -> Iterator["pa.RecordBatch"]:
+    """Streams the transaction columns of a CSV file as Arrow record batches.
+
+    Args:
+        filepath (str): The path to the CSV file.
+
+    Yields:
+        pa.RecordBatch: A batch holding only the 'date', 'memo' and 'amount'
+            columns, with 'amount' already parsed as float64.
+    """
+    if not os.path.getsize(filepath):
+        return
+    yield from pa_csv.open_csv(
+        filepath,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={
+                "date": pa.string(),
+                "memo": pa.string(),
+                "amount": pa.float64(),
+            },
+            include_columns=["date", "memo", "amount"],
+        ),
+    )
+
+
+@lru_cache(maxsize=8192)
+def _month_year(date_str: str, date_format: str) -> str:
+    """Converts a date string to a 'YYYY-MM' string, caching repeated dates."""
+    if (
+        date_format == "%m/%d/%Y"
+        and len(date_str) == 10
+        and date_str.isascii()
+        and date_str[2] == date_str[5] == "/"
+        and date_str[:2].isdigit()
+        and date_str[3:5].isdigit()
+        and date_str[6:].isdigit()
+    ):
+        # Still rejects impossible dates such as 13/01/2024 or 02/30/2024.
+        datetime(int(date_str[6:]), int(date_str[:2]), int(date_str[3:5]))
+        return f"{date_str[6:]}-{date_str[:2]}"
+    return datetime.strptime(date_str, date_format).strftime("%Y-%m")
 
 
 def parse_transaction_row(
-    row: dict[str, str], date_format: str
+    row: tuple[str, str, str], date_format: str
 ) -> tuple[str, float]:
     """Parses and validates data from a single transaction row.
 
     Args:
-        row (dict[str, str]): A dictionary representing a single CSV row.
+        row (tuple[str, str, str]): The 'date', 'memo' and 'amount' values of
+            a single CSV row.
         date_format (str): The expected format of the date string
             (e.g., '%m/%d/%Y').
 
@@ -32,53 +169,99 @@ def parse_transaction_row(
         tuple[str, float]: A tuple containing the month-year string
             (YYYY-MM) and the amount.
     """
-    date_str = row["date"]
-    dt_object = datetime.strptime(date_str, date_format)
-    month_year = dt_object.strftime("%Y-%m")
-
-    amount_str = row["amount"]
-    amount = float(amount_str)
+    date_str, _, amount_str = row
+    month_year = _month_year(date_str, date_format)
+    amount = parse_float(amount_str)
 
     return month_year, amount
 
 
 def filter_and_aggregate_transactions(
-    transactions_reader: Generator[dict[str, str], None, None],
+    transactions_reader: Generator[tuple[str, str, str], None, None],
     keyword: str,
     date_format: str,
 ) -> dict[str, float]:
     """Filters transactions by keyword in the memo and aggregates amounts.
 
     Args:
-        transactions_reader (Generator[dict[str, str], None, None]): A
-            generator yielding CSV rows.
+        transactions_reader (Generator[tuple[str, str, str], None, None]): A
+            generator yielding the 'date', 'memo' and 'amount' of CSV rows.
         keyword (str): The string to search for in the 'memo' column.
         date_format (str): The format of the date string (e.g., '%m/%d/%Y').
 
     Returns:
         dict[str, float]: A dictionary where keys are 'YYYY-MM' strings and
             values are the total aggregated amounts for transactions matching
-            the search term.
-
-    Raises:
-        ValueError: If no transactions found.
+            the search term. Empty if no transactions match.
     """
     monthly_totals: dict[str, float] = defaultdict(float)
+    search = re.compile(re.escape(keyword), re.IGNORECASE).search
+    parse_row = parse_transaction_row
 
-    for row_num, row in enumerate(
-        transactions_reader, start=2
-    ):  # Start at 2 for header + first data row
-        memo = row["memo"]
-        if keyword.upper() not in memo.upper():
+    for row in transactions_reader:
+        if not search(row[1]):
             continue
 
-        month_year, amount = parse_transaction_row(row, date_format)
+        month_year, amount = parse_row(row, date_format)
         monthly_totals[month_year] += amount
 
-    if not monthly_totals:
-        raise ValueError(
-            f"No transactions found containing '{keyword}' in the memo."
+    return monthly_totals
+
+
+def filter_and_aggregate_batches(
+    batches: Iterator["pa.RecordBatch"],
+    keyword: str,
+    date_format: str,
+) -> dict[str, float]:
+    """Filters Arrow transaction batches by keyword and aggregates amounts.
+
+    Args:
+        batches (Iterator[pa.RecordBatch]): Record batches with 'date',
+            'memo' and 'amount' columns.
+        keyword (str): The string to search for in the 'memo' column.
+        date_format (str): The format of the date string (e.g., '%m/%d/%Y').
+
+    Returns:
+        dict[str, float]: A dictionary where keys are 'YYYY-MM' strings and
+            values are the total aggregated amounts for transactions matching
+            the search term. Empty if no transactions match.
+    """
+    matches: list[pa.RecordBatch] = []
+    memo_filter = pc.MatchSubstringOptions(keyword, ignore_case=True)
+
+    for batch in batches:
+        mask = pc.match_substring(batch.column("memo"), options=memo_filter)
+        filtered = batch.filter(mask)
+        if not filtered.num_rows:
+            continue
+
+        timestamps = pc.strptime(
+            filtered.column("date"), format=date_format, unit="s"
+        )
+        matches.append(
+            pa.RecordBatch.from_arrays(
+                [
+                    pc.strftime(timestamps, format="%Y-%m"),
+                    filtered.column("amount"),
+                ],
+                names=["month_year", "amount"],
+            )
+        )
+
+    if not matches:
+        return {}
+
+    totals = (
+        pa.Table.from_batches(matches)
+        .group_by("month_year")
+        .aggregate([("amount", "sum")])
+    )
+    monthly_totals: dict[str, float] = dict(
+        zip(
+            totals.column("month_year").to_pylist(),
+            totals.column("amount_sum").to_pylist(),
         )
+    )
 
     return monthly_totals
 
@@ -90,39 +273,115 @@ def report_monthly_totals(monthly_data: dict[str, float], keyword: str) -> None:
         monthly_data (dict[str, float]): A dictionary of monthly totals.
         keyword (str): The original search term for context in the report.
     """
-    print(f"\n--- Monthly Spending for '{keyword}' ---")
-    for month_year in sorted(monthly_data.keys()):
-        print(f"{month_year}: ${monthly_data[month_year]:,.2f}")
+    lines = [
+        f"{month_year}: ${monthly_data[month_year]:,.2f}"
+        for month_year in sorted(monthly_data)
+    ]
+    sys.stdout.write(
+        f"\n--- Monthly Spending for '{keyword}' ---\n"
+        + "\n".join(lines)
+        + "\n"
+    )
+
+
+def collect_csv_paths(filepath: str) -> list[str]:
+    """Expands a file, directory or glob pattern into CSV file paths.
+
+    Args:
+        filepath (str): A CSV file, a directory of CSV files or a glob
+            pattern matching CSV files.
+
+    Returns:
+        list[str]: The sorted CSV file paths.
+
+    Raises:
+        FileNotFoundError: If no CSV files are found.
+    """
+    path = Path(filepath)
+    if path.is_dir():
+        paths = sorted(str(csv_path) for csv_path in path.glob("*.csv"))
+    elif path.is_file() or not any(char in filepath for char in "*?["):
+        paths = [filepath]
+    else:
+        paths = sorted(glob.glob(filepath))
+
+    if not paths:
+        raise FileNotFoundError(f"No CSV files found for '{filepath}'.")
+    return paths
+
+
+def aggregate_file(
+    filepath: str, keyword: str, date_format: str
+) -> dict[str, float]:
+    """Aggregates monthly totals matching keyword for a single CSV file.
+
+    Args:
+        filepath (str): The path to the CSV file.
+        keyword (str): The string to search for in the 'memo' column.
+        date_format (str): The format of the date string (e.g., '%m/%d/%Y').
+
+    Returns:
+        dict[str, float]: A dictionary of monthly totals for the file.
+    """
+    if pa is None:
+        return filter_and_aggregate_transactions(
+            transactions_reader=read_candidate_rows(filepath, keyword),
+            keyword=keyword,
+            date_format=date_format,
+        )
+    return filter_and_aggregate_batches(
+        batches=read_csv_batches(filepath),
+        keyword=keyword,
+        date_format=date_format,
+    )
 
 
 def analyze_and_report(
     filepath: str, keyword: str = "KING SOOPERS", date_format: str = "%m/%d/%Y"
 ) -> None:
-    """Searches for keyword in CSV file and aggregates monthly totals.
+    """Searches for keyword in CSV files and aggregates monthly totals.
+
+    Multiple files are aggregated in parallel worker processes and their
+    monthly totals merged.
 
     Args:
-        filepath (str): The path to the CSV file.
+        filepath (str): The path to a CSV file, a directory of CSV files or
+            a glob pattern.
         keyword (str): The string to search for in the 'memo' column.
         date_format (str): The format the date will be in
             (default is '%m/%d/%Y').
+
+    Raises:
+        ValueError: If no transactions found.
     """
     print(f"Starting analysis for '{filepath}' with search term '{keyword}'...")
-    transaction_rows = read_csv_rows(filepath)
+    paths = collect_csv_paths(filepath)
+
+    if len(paths) == 1:
+        aggregated_data = aggregate_file(paths[0], keyword, date_format)
+    else:
+        aggregated_data = defaultdict(float)
+        with ProcessPoolExecutor() as executor:
+            for partial in executor.map(
+                aggregate_file, paths, repeat(keyword), repeat(date_format)
+            ):
+                for month_year, amount in partial.items():
+                    aggregated_data[month_year] += amount
+
+    if not aggregated_data:
+        raise ValueError(
+            f"No transactions found containing '{keyword}' in the memo."
+        )
 
-    aggregated_data = filter_and_aggregate_transactions(
-        transactions_reader=transaction_rows,
-        keyword=keyword,
-        date_format=date_format,
-    )
     report_monthly_totals(aggregated_data, keyword)
 
 
 def print_help():
     """Prints the help message for the script."""
     print("Usage: python agregate_spending_csv.py <filepath> [keyword] [date_format]")
-    print("\nAnalyzes spending from a CSV file.")
+    print("\nAnalyzes spending from one or more CSV files.")
     print("\nArguments:")
-    print("  filepath:    The path to the CSV file.")
+    print("  filepath:    The path to a CSV file, a directory of CSV files or a glob pattern.")
     print("  keyword:     The string to search for in the 'memo' column (default: 'KING SOOPERS').")
     print("  date_format: The format of the date string (default: '%m/%d/%Y').")
 
@@ -139,7 +398,7 @@ def main() -> None:
         print_help()
         sys.exit(0)
 
-    if 1 > len(sys.argv) > 4:
+    if not 2 <= len(sys.argv) <= 4:
         raise RuntimeError("Incorrect number of arguments")
 
     args = sys.argv[1:]
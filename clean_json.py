@@ -1,10 +1,16 @@
+# /// script
+# dependencies = ["ijson", "orjson"]
+# ///
+
 import argparse
 import logging
-import json
 import sys
 from pathlib import Path
 from typing import Any
 
+import ijson
+import orjson
+
 logger = logging.getLogger(__name__)
 
 
@@ -85,6 +91,15 @@ def create_parser() -> argparse.ArgumentParser:
         "-q", "--quiet", action="store_true", help="Suppress console output"
     )
     parser.add_argument("-l", "--log-file", type=str, help="Path to log file")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "Parse and write a JSON object file incrementally, skipping the "
+            "raw input and output buffers (the parsed object is still held "
+            "in memory)"
+        ),
+    )
 
     return parser
 
@@ -97,70 +112,114 @@ class JSONSorter:
         self.output: str | None = None
 
     def _expand_dot_notation(self, data: dict[str, Any]) -> dict[str, Any]:
-        """Converts dot notation keys in a flat dictionary into nested dictionaries."""
-        result: dict[str, Any] = {}
-        for key, value in data.items():
+        """Expands dot notation keys into nested dictionaries in place."""
+        setdefault = dict.setdefault
+        for key in [key for key in data if "." in key]:
+            logger.debug("Expanding dot notation for key: %s", key)
+            value = data.pop(key)
             parts: list[str] = key.split(".")
-            if len(parts) == 1:
-                result[key] = value
-                continue
-            logger.debug(f"Expanding dot notation for key: {key}")
-            current = result
+            current = data
             for part in parts[:-1]:
-                try:
-                    current = current.setdefault(part, {})
-                except TypeError:
+                current = setdefault(current, part, {})
+                if not isinstance(current, dict):
                     self._exception_message = (
                         f"Could not expand key: {key}. Conflict at {part}"
                     )
                     self._exit_code = 1
-                    raise
+                    raise TypeError(self._exception_message)
             current[parts[-1]] = value
-        logger.debug(f"Expanded dictionary: {result}")
-        return result
-
-    def _sort_values(self, obj: Any) -> Any:
-        """Recursively sorts dictionaries by key, leaving lists in original order."""
-        if isinstance(obj, dict):
-            logger.debug(f"Sorting dictionary keys: {list(obj.keys())}")
-            expanded = self._expand_dot_notation(obj)
-            return {
-                k: self._sort_values(expanded)
-                for k, v in sorted(obj.items())
-            }
-        elif isinstance(obj, list):
-            return [self._sort_values(item) for item in obj]
-        return obj
-
-    def _process_and_pretty_print_json(self, json_string: str) -> str:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Expanded dictionary: %r", data)
+        return data
+
+    def _process_and_pretty_print_json(self, json_string: bytes | str) -> str:
         """Sorts JSON by key and expands dot notation."""
         logger.info("Processing JSON input...")
         try:
-            data = json.loads(json_string)
+            data = orjson.loads(json_string)
             logger.debug("JSON parsed successfully")
-            sorted_data = self._sort_values(data)
-            pretty_json = json.dumps(
-                sorted_data, indent=2, separators=(",", ": ")
-            )
+            if isinstance(data, dict):
+                data = self._expand_dot_notation(data)
+            pretty_json = orjson.dumps(
+                data, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+            ).decode()
             logger.debug("JSON processed successfully")
             return pretty_json
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.exception(f"Error decoding JSON: {e}")
             self._exit_code = 1
             raise
 
-    def _read_file(self, filepath: Path) -> str:
-        """Reads file and returns str or exits on error."""
+    def _read_file(self, filepath: Path) -> bytes:
+        """Reads file and returns raw bytes or exits on error."""
         logger.info(f"Reading file: {filepath}")
         try:
-            content = filepath.read_text(encoding="utf-8", errors="strict")
+            content = filepath.read_bytes()
             logger.debug(f"File read successfully, {len(content)} bytes")
             return content
-        except (OSError, UnicodeError) as e:
+        except OSError as e:
             self._exception_message = f"Error reading file: {e}"
             self._exit_code = 1
             raise
 
+    def _stream_file(self, filepath: Path) -> dict[str, Any]:
+        """Streams a JSON object file into an expanded dictionary.
+
+        Only the raw file bytes are skipped; the parsed object is built in
+        full.
+        """
+        logger.info(f"Streaming file: {filepath}")
+        try:
+            with filepath.open("rb") as f:
+                first = f.read(64).lstrip()[:1]
+                if first != b"{":
+                    self._exception_message = (
+                        "Streaming requires a JSON object at the top level"
+                    )
+                    self._exit_code = 1
+                    raise TypeError(self._exception_message)
+                f.seek(0)
+                data = self._expand_dot_notation(
+                    dict(ijson.kvitems(f, "", use_float=True))
+                )
+            logger.debug(f"File streamed successfully, {len(data)} keys")
+            return data
+        except OSError as e:
+            self._exception_message = f"Error reading file: {e}"
+            self._exit_code = 1
+            raise
+        except ijson.JSONError as e:
+            self._exception_message = f"Error decoding JSON: {e}"
+            self._exit_code = 1
+            raise
+
+    def _write_stream(self, filepath: Path, data: dict[str, Any]) -> None:
+        """Writes a dictionary to file one sorted top-level key at a time."""
+        logger.info(f"Writing output to file: {filepath}")
+        option = orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+        try:
+            with filepath.open("wb") as f:
+                if not data:
+                    f.write(b"{}")
+                    return
+                separator = b"{\n  "
+                for key in sorted(data):
+                    f.write(separator)
+                    f.write(orjson.dumps(key))
+                    f.write(b": ")
+                    f.write(
+                        orjson.dumps(data[key], option=option).replace(
+                            b"\n", b"\n  "
+                        )
+                    )
+                    separator = b",\n  "
+                f.write(b"\n}")
+            logger.debug("File written successfully")
+        except OSError as e:
+            self._exception_message = f"Could not write file: {e}"
+            self._exit_code = 1
+            raise
+
     def _write_file(self, filepath: Path, data: str) -> None:
         """Writes data to file."""
         logger.info(f"Writing output to file: {filepath}")
@@ -176,6 +235,12 @@ class JSONSorter:
         """Main execution routine."""
         logger.debug(f"Sorting JSON with arguments: {args}")
 
+        if args.stream:
+            self._write_stream(args.file, self._stream_file(args.file))
+            if not args.quiet and args.verbosity > 0:
+                self.output = f"Successfully processed JSON file: {args.file}"
+            return
+
         json_string = self._read_file(args.file) if args.file else args.data
 
         pretty_json = self._process_and_pretty_print_json(json_string)
@@ -193,7 +258,8 @@ class JSONSorter:
             OSError,
             UnicodeError,
             TypeError,
-            json.JSONDecodeError,
+            orjson.JSONDecodeError,
+            ijson.JSONError,
         ):
             logger.exception(self._exception_message)
         except Exception as e:
@@ -211,7 +277,7 @@ def main() -> None:
             if not sys.stdin:
                 print("Error: --stdin flag used but no stdin input found")
                 sys.exit(2)
-            args.data = sys.stdin
+            args.data = sys.stdin.buffer.read()
         setup_logger(args)
         logger.debug("Starting JSONSorter() execution")
 
@@ -221,6 +287,10 @@ def main() -> None:
             )
             sys.exit(2)
 
+        if args.stream and not args.file:
+            print("Error: --stream can only be used with --file input.")
+            sys.exit(2)
+
         sorter = JSONSorter()
         exit_code = sorter.run(args)
         if sorter.output:
@@ -1,38 +1,37 @@
 import json
+import re
 import sys
-from collections.abc import Generator
+from pathlib import Path
 
-
-def read_file(filename: str) -> Generator[str, None, None]:
-    with open(filename, "r") as f:
-        for line in f:
-            yield line
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 def write_json(filename: str, data: dict[str, str]):
-    with open(filename, "w") as f:
-        json.dump(data, f, indent=2)
-
-
-def get_key_value(line: str):
-    key, value = line.split(":", maxsplit=1)
-    return key.strip(), value.strip()
+    if orjson is None:
+        with open(filename, "w") as f:
+            json.dump(data, f, indent=2)
+        return
+    Path(filename).write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
 
-def form_dict(gen: Generator[str]):
+def form_dict(text: str):
     zones = {}
-    tz = {}
-    for line in gen:
-        if line.strip():
-            key, value = get_key_value(line)
-            tz[key] = value
+    strip = str.strip
+    for block in re.split(r"\n\s*\n", text):
+        if not strip(block):
             continue
-
-        if not tz:
-            continue
-
+        tz = {
+            strip(key): strip(value)
+            for key, value in (
+                line.split(":", maxsplit=1)
+                for line in block.splitlines()
+                if strip(line)
+            )
+        }
         zones[tz["Id"]] = tz
-        tz = {}
     return zones
 
 
@@ -55,5 +54,5 @@ if __name__ == "__main__":
         sys.exit(1)
     zone_file = sys.argv[1]
     output_file = sys.argv[2]
-    zones = form_dict(read_file(zone_file))
+    zones = form_dict(Path(zone_file).read_text())
     write_json(output_file, zones)
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 # /// script
-# dependencies = ["python-dateutil"]
+# dependencies = ["ijson", "numpy", "python-dateutil"]
 # ///
 
 from pathlib import Path
@@ -9,38 +9,64 @@ import struct
 import csv
 import json
 from datetime import datetime, timedelta, date
-from collections import defaultdict
+from functools import lru_cache
 from dateutil import tz
+import ijson
+import numpy as np
 import argparse
 import logging
 
 _l = logging.getLogger(__name__)
+_FILE_DATE_RE = re.compile(r".+(\d{4}-\d{2}-\d{2})\..+")
+_ARG_DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+# SpO2, bpm, invalid marker and padding of one Viatom record
+VIATOM_RECORD = np.dtype([
+    ("spo2", "u1"),
+    ("bpm", "u1"),
+    ("invalid", "u1"),
+    ("padding", "u1", 2),
+])
 
 
-def minutes_to_time(minutes: int) -> str:
+@lru_cache(maxsize=None)
+def get_tz(name: str):
+    return tz.gettz(name)
+
+
+def to_local(timestamp: int, timezone: str) -> datetime:
+    """Converts UTC epoch seconds to a datetime in the profile's timezone"""
+    return datetime.fromtimestamp(timestamp, tz=get_tz(timezone))
+
+
+def minutes_to_time(minutes: float) -> str:
     return f"{int(minutes // 60):02d}:{int(minutes % 60):02d}:{int((minutes % 1) * 60):02d}"
 
 
+def whole_minutes_to_time(minutes: int) -> str:
+    """Formats a whole number of minutes, skipping the seconds arithmetic"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
 def export_spo2_as_viatom(args):
     timezone = read_profile_timezone(args)
     csv_files, json_files = get_spo2_files(args)
     if len(csv_files) == 0 or len(json_files) == 0:
         raise FileNotFoundError("No SpO2 or heart rate data detected!")
 
-    sessions, data = align_spo2_data(csv_files, json_files, timezone)
+    sessions, data = align_spo2_data(csv_files, json_files)
     _l.debug("Detected SpO2 sessions:")
     for session in sessions:
         _l.debug(
             "".join([
-                session[0].strftime("%Y-%m-%d %H:%M:%S"),
+                to_local(session[0], timezone).strftime("%Y-%m-%d %H:%M:%S"),
                 "-",
-                session[1].strftime("%Y-%m-%d %H:%M:%S"),
+                to_local(session[1], timezone).strftime("%Y-%m-%d %H:%M:%S"),
             ])
         )
     chunks = divide_data_to_viatom_chunks(sessions, data)
 
     for chunk in chunks:
-        write_to_viatom_file(args, chunk)
+        write_to_viatom_file(args, chunk, timezone)
 
 
 def export_sleep_phases_as_dreem(args):
@@ -52,215 +78,224 @@ def export_sleep_phases_as_dreem(args):
 
 
 def read_profile_timezone(args) -> str:
-    timezone = None
     with open(args.fitbit_path / "Your Profile" / "Profile.csv", "r") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            timezone = row["timezone"]
+        reader = csv.reader(f)
+        header = next(reader, None)
+        row = next(reader, None)
     # replacing if/then RuntimeError
-    assert timezone is not None, "Profile not detected!"
-    _l.debug("Timezone:", timezone)
+    assert row is not None, "Profile not detected!"
+    timezone = row[header.index("timezone")]
+    _l.debug("Timezone: %s", timezone)
     return timezone
 
 
 def check_file_date(args, file) -> bool:
     """Ensures the file's date is within the threshold requested"""
     _l.debug(file.name)
-    match = re.match(r".+(\d{4})-(\d\d)-(\d\d)\..+", file.name)
-    file_date = date(
-        year=int(match.group(1)),
-        month=int(match.group(2)),
-        day=int(match.group(3)),
-    )
+    match = _FILE_DATE_RE.match(file.name)
+    file_date = date.fromisoformat(match.group(1))
     return args.start_date <= file_date <= args.end_date
 
 
 def get_spo2_files(args) -> tuple[list]:
     spo2_path = args.fitbit_path / "Oxygen Saturation (SpO2)"
-    spo2_files = [
+    # file names end in their date, so name order is chronological order
+    spo2_files = sorted(
         file
         for file in spo2_path.glob("Minute SpO2*.csv")
         if check_file_date(args, file)
-    ]
+    )
     bpm_path = args.fitbit_path / "Global Export Data"
-    bpm_files = [
+    bpm_files = sorted(
         file
         for file in bpm_path.glob("heart_rate-*.json")
         if check_file_date(args, file)
-    ]
+    )
     return spo2_files, bpm_files
 
 
-def read_csv(file_name, timezone):
+def read_csv(file_name) -> tuple[np.ndarray, np.ndarray]:
+    """Parses SpO2 readings into UTC epoch second and integer value arrays"""
     with open(file_name, "r") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            utc_timestamp = datetime.strptime(
-                row["timestamp"], "%Y-%m-%dT%H:%M:%SZ"
-            )
-            utc_datetime = utc_timestamp.replace(tzinfo=tz.gettz("UTC"))
-            timestamp = utc_datetime.astimezone(tz.gettz(timezone))
-            value = round(float(row["value"]))
-            if value < 61:
-                continue
-            if value == 100:
-                value = 99
-            yield timestamp, value
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            rows = []
+        else:
+            ts_idx = header.index("timestamp")
+            val_idx = header.index("value")
+            rows = [(row[ts_idx], row[val_idx]) for row in reader]
+    if not rows:
+        return np.array([], dtype=np.int64), np.array([], dtype=int)
+    stamps, values = zip(*rows)
+    # "YYYY-MM-DDTHH:MM:SSZ" truncated to 19 characters drops the "Z"
+    timestamps = (
+        np.array(stamps, dtype="U19").astype("datetime64[s]").astype(np.int64)
+    )
+    values = np.rint(np.array(values, dtype=float)).astype(int)
+    valid = values >= 61
+    return timestamps[valid], np.where(values[valid] == 100, 99, values[valid])
+
+
+def read_json(file_name) -> tuple[np.ndarray, np.ndarray]:
+    """Parses heart rate readings into UTC epoch second and bpm arrays"""
+    stamps = []
+    values = []
+    with open(file_name, "rb") as f:
+        for entry in ijson.items(f, "item"):
+            # "MM/DD/YY HH:MM:SS" reordered to ISO 8601 for numpy's parser
+            d = entry["dateTime"]
+            stamps.append(f"20{d[6:8]}-{d[0:2]}-{d[3:5]}T{d[9:]}")
+            values.append(entry["value"]["bpm"])
+    return (
+        np.array(stamps, dtype="datetime64[s]").astype(np.int64),
+        np.array(values, dtype=int),
+    )
 
 
-def read_json(file_name, timezone):
-    with open(file_name, "r") as f:
-        data = json.load(f)
-        for entry in data:
-            utc_timestamp = datetime.strptime(
-                entry["dateTime"], "%m/%d/%y %H:%M:%S"
-            )
-            utc_datetime = utc_timestamp.replace(tzinfo=tz.gettz("UTC"))
-            timestamp = utc_datetime.astimezone(tz.gettz(timezone))
-            value: int = entry["value"]["bpm"]
-            yield timestamp, value
-
-
-def align_spo2_data(csv_files, json_files, timezone) -> tuple[list, dict]:
-    data = defaultdict(lambda: [None, None])
-    sessions = []
-    for file_name in csv_files:
-        for timestamp, value in read_csv(file_name, timezone):
-            if len(sessions) == 0:
-                sessions.append([timestamp])
-            else:
-                prev_timestamp = sessions[-1][0]
-                # start new sleep session if data points are at least 5 minutes apart
-                if timestamp - prev_timestamp > timedelta(minutes=5):
-                    sessions[-1].append(prev_timestamp)
-                    sessions.append([timestamp])
-            data[timestamp][0] = value
-            prev_timestamp = timestamp
-    if len(sessions) == 0:
+def align_spo2_data(
+    csv_files, json_files
+) -> tuple[list, tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    spo2_reads = [read_csv(file_name) for file_name in csv_files]
+    spo2_timestamps = np.concatenate([r[0] for r in spo2_reads])
+    spo2_values = np.concatenate([r[1] for r in spo2_reads])
+    if len(spo2_timestamps) == 0:
         raise FileNotFoundError("No SPO2 night sessions detected!")
-    if len(sessions[-1]) == 1:
-        sessions[-1].append(prev_timestamp)
-    last_bpm_timestamp = None
-    for file_name in json_files:
-        for timestamp, value in read_json(file_name, timezone):
-            data[timestamp][1] = value
-            last_bpm_timestamp = timestamp
-    if last_bpm_timestamp is None:
+    if np.any(spo2_timestamps[1:] < spo2_timestamps[:-1]):
+        order = np.argsort(spo2_timestamps, kind="stable")
+        spo2_timestamps = spo2_timestamps[order]
+        spo2_values = spo2_values[order]
+
+    # start new sleep session if data points are more than 5 minutes apart
+    gaps = np.flatnonzero(np.diff(spo2_timestamps) > 300)
+    starts = spo2_timestamps[np.r_[0, gaps + 1]]
+    ends = spo2_timestamps[np.r_[gaps, len(spo2_timestamps) - 1]]
+
+    bpm_reads = [read_json(file_name) for file_name in json_files]
+    bpm_timestamps = np.concatenate([r[0] for r in bpm_reads])
+    bpm_values = np.concatenate([r[1] for r in bpm_reads])
+    if len(bpm_timestamps) == 0:
         raise FileNotFoundError("No heart rate data detected!")
-    filtered_sessions = []
-    for session in sessions:
-        if session[1] < last_bpm_timestamp:
-            filtered_sessions.append(session)
-    return filtered_sessions, data
-
+    last_bpm_timestamp = bpm_timestamps.max()
+    sessions = [
+        (int(start), int(end))
+        for start, end in zip(starts, ends)
+        if end < last_bpm_timestamp
+    ]
 
-def divide_data_to_viatom_chunks(sessions, data) -> list[list[tuple]]:
-    sorted_data = sorted(data.items())
+    # merge both series on one timeline, 0 marking a missing reading; the
+    # stable sort is a timsort, which merges the two presorted runs linearly
+    timestamps = np.concatenate((spo2_timestamps, bpm_timestamps))
+    spo2 = np.concatenate((spo2_values, np.zeros(len(bpm_values), int)))
+    bpm = np.concatenate((np.zeros(len(spo2_values), int), bpm_values))
+    order = np.argsort(timestamps, kind="stable")
+    timestamps, spo2, bpm = timestamps[order], spo2[order], bpm[order]
+
+    # carry the last known reading forward over missing ones
+    index = np.arange(len(timestamps))
+    spo2 = spo2[np.maximum.accumulate(np.where(spo2 > 0, index, 0))]
+    bpm = bpm[np.maximum.accumulate(np.where(bpm > 0, index, 0))]
+
+    # readings sharing a timestamp collapse into the last, filled, row
+    last = np.append(timestamps[1:] != timestamps[:-1], True)
+    return sessions, (timestamps[last], spo2[last], bpm[last])
+
+
+def divide_data_to_viatom_chunks(
+    sessions, data
+) -> list[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Expands each session onto a 4 second grid and splits it into chunks.
+
+    Every grid slot takes the readings of the last data point at or before
+    it. The grid runs from the session start up to the data point following
+    the last one whose slot still falls inside the session.
+    """
+    timestamps, spo2, bpm = data
+    step = 4
     chunks = []
-    chunk = []
-    for session in sessions:
-        last_timestamp = None
-        for i in range(len(sorted_data) - 1):
-            if last_timestamp is None:
-                timestamp = sorted_data[i][0]
-            else:
-                timestamp = last_timestamp
-            end_timestamp = sorted_data[i + 1][0]
-            values = sorted_data[i][1]
-            if values[0] is not None:
-                spo2 = values[0]
-            if values[1] is not None:
-                bpm = values[1]
-            if timestamp < session[0] or timestamp > session[1]:
-                continue
-            records = 0
-            while timestamp < end_timestamp:
-                if len(chunk) >= 4095:
-                    chunks.append(chunk)
-                    chunk = []
-                chunk.append((timestamp, spo2, bpm))
-                timestamp += timedelta(seconds=4)
-                records += 1
-            last_timestamp = timestamp
-        if chunk:
-            chunks.append(chunk)
-            chunk = []
-    if chunk:
-        chunks.append(chunk)
+    for start, end in sessions:
+        last_slot = start + (end - start) // step * step
+        last = min(
+            int(np.searchsorted(timestamps, last_slot, side="right")) - 1,
+            len(timestamps) - 2,
+        )
+        count = max(-(-(timestamps[last + 1] - start) // step), 0)
+        slots = start + step * np.arange(count)
+        points = np.searchsorted(timestamps, slots, side="right") - 1
+        for offset in range(0, count, 4095):
+            chunk = slice(offset, offset + 4095)
+            chunks.append((
+                slots[chunk],
+                spo2[points[chunk]],
+                bpm[points[chunk]],
+            ))
     return chunks
 
 
-def write_to_viatom_file(args, data):
-    if len(data) > 4095:
+def write_to_viatom_file(args, data, timezone):
+    timestamps, spo2, bpm = data
+    if len(timestamps) > 4095:
         raise RuntimeError(
-            f"Data chunk ({data[0][0]}, {data[-1][0]}) too long ({len(data)})!"
+            f"Data chunk ({timestamps[0]}, {timestamps[-1]}) too long ({len(timestamps)})!"
         )
-    bin_file = "{}.bin".format(data[0][0].strftime("%Y%m%d%H%M%S"))
-    with open(args.export_path / bin_file, "wb") as f:
-        # Write header
-        f.write(struct.pack("<BB", 0x5, 0x0))  # HEADER_LSB, HEADER_MSB
-        f.write(struct.pack("<H", data[0][0].year))  # YEAR_LSB, YEAR_MSB
-        f.write(
-            struct.pack(
-                "<BBBBB",
-                data[0][0].month,
-                data[0][0].day,
-                data[0][0].hour,
-                data[0][0].minute,
-                data[0][0].second,
-            )
-        )  # MONTH, DAY, HOUR, MINUTES, SECONDS
-        f.write(
-            struct.pack("<I", len(data) * 5 + 40)
-        )  # FILESIZE_0, FILESIZE_1, FILESIZE_2, 0x00
-        f.write(struct.pack("<H", len(data) * 4))  # DURATION_LSB, DURATION_MSB
-        f.write(b"\x00" * 25)  # Padding
-
-        # Write records
-        for record in data:
-            if record[1] <= 61:
-                _l.warning("TOOLOW:", record[1])
-                f.write(b"\xff")
-                f.write(struct.pack("<B", record[2]))
-                f.write(b"\xff\x00\x00")  # INVALID VALUE
-            else:
-                if record[1] > 99:
-                    _l.warning("TOOHIGH:", record[1])
-                    f.write(struct.pack("<B", 99))  # MAX VALUE
-                else:
-                    f.write(struct.pack("<B", record[1]))  # VALUE
-                f.write(struct.pack("<B", record[2]))
-                f.write(b"\x00\x00\x00")  # Padding
+    start = to_local(int(timestamps[0]), timezone)
+    year, month, day = start.year, start.month, start.day
+    hour, minute, second = start.hour, start.minute, start.second
+    bin_file = (
+        f"{year:04d}{month:02d}{day:02d}{hour:02d}{minute:02d}{second:02d}.bin"
+    )
+    invalid = spo2 <= 61
+    if invalid.any():
+        _l.warning(f"TOOLOW: {np.count_nonzero(invalid)} readings")
+    too_high = spo2 > 99
+    if too_high.any():
+        _l.warning(f"TOOHIGH: {np.count_nonzero(too_high)} readings")
+    # the whole file is assembled in one zeroed buffer, the records being
+    # filled in place through a structured view past the 40 byte header
+    buffer = bytearray(40 + len(timestamps) * VIATOM_RECORD.itemsize)
+    records = np.frombuffer(buffer, dtype=VIATOM_RECORD, offset=40)
+    records["spo2"] = np.where(invalid, 0xFF, np.minimum(spo2, 99))  # VALUE
+    records["bpm"] = bpm
+    records["invalid"][invalid] = 0xFF  # INVALID VALUE
+    # HEADER_LSB, HEADER_MSB, YEAR, MONTH, DAY, HOUR, MINUTES, SECONDS,
+    # FILESIZE, DURATION, padding
+    struct.pack_into(
+        "<BBHBBBBBIH25x",
+        buffer,
+        0,
+        0x5,
+        0x0,
+        year,
+        month,
+        day,
+        hour,
+        minute,
+        second,
+        len(timestamps) * 5 + 40,
+        len(timestamps) * 4,
+    )
+    with open(args.export_path / bin_file, "wb", buffering=0) as f:
+        f.write(buffer)
 
         _l.info(
-            f"Exported {bin_file} (size: {len(data) * 5 + 40}, duration: {minutes_to_time(len(data) / 15)})"
+            f"Exported {bin_file} (size: {len(timestamps) * 5 + 40}, duration: {minutes_to_time(len(timestamps) / 15)})"
         )
 
 
-def generate_dreem_hypnogram(json_data) -> list:
+def generate_dreem_hypnogram(json_data) -> np.ndarray:
     levels = {"wake": "WAKE", "rem": "REM", "light": "Light", "deep": "Deep"}
     sleep_stages = []
+    intervals = []
     for item in json_data:
-        intervals = item["seconds"] // 30
         if item["level"] in levels:
-            sleep_stages.extend([levels[item["level"]]] * intervals)
+            sleep_stages.append(levels[item["level"]])
+            intervals.append(item["seconds"] // 30)
         else:
             _l.warning(
                 "Sleep stage '{}' is not recognized".format(item["level"])
             )
-    return sleep_stages
-
-
-def filter_sleep_data(args, sleep_record: dict[str, any]) -> bool:
-    """Replaces the single lambda to match date of sleep information within requested range."""
-    if "light" not in map(
-        lambda y: y.lower(), sleep_record["levels"]["summary"].keys()
-    ):
-        return False
-    if "dateOfSleep" not in sleep_record.keys():
-        return False
-    sleep_date = date.fromisoformat(sleep_record["dateOfSleep"])
-    return args.start_date <= sleep_date <= args.end_date
+    # one 30 second epoch per entry, expanded in a single contiguous array
+    return np.repeat(np.array(sleep_stages, dtype=str), intervals)
 
 
 def write_to_dreem(args, json_files):
@@ -279,13 +314,23 @@ def write_to_dreem(args, json_files):
             "Hypnogram",
         ])
 
+        # ISO 8601 dates compare correctly as plain strings
+        start_date = args.start_date.isoformat()
+        end_date = args.end_date.isoformat()
         for file in json_files:
             with open(file, "r") as file:
                 json_data = json.load(file)
-                filtered_data = filter(
-                    lambda x: filter_sleep_data(args, x), json_data
-                )
-                for item in filtered_data:
+                rows = []
+                for item in json_data:
+                    sleep_date = item.get("dateOfSleep")
+                    if not sleep_date or not (
+                        start_date <= sleep_date <= end_date
+                    ):
+                        continue
+                    # Fitbit summary keys are already lowercase
+                    summary = item.get("levels", {}).get("summary")
+                    if not summary or "light" not in summary:
+                        continue
                     start_time = item["startTime"]
                     stop_time = item["endTime"]
                     _l.info(
@@ -294,27 +339,25 @@ def write_to_dreem(args, json_files):
                     sleep_onset_duration = minutes_to_time(
                         item["duration"] / 60000
                     )
-                    light_sleep_duration = minutes_to_time(
-                        item["levels"]["summary"]["light"]["minutes"]
+                    light_sleep_duration = whole_minutes_to_time(
+                        summary["light"]["minutes"]
                     )
-                    deep_sleep_duration = minutes_to_time(
-                        item["levels"]["summary"]["deep"]["minutes"]
+                    deep_sleep_duration = whole_minutes_to_time(
+                        summary["deep"]["minutes"]
                     )
-                    rem_duration = minutes_to_time(
-                        item["levels"]["summary"]["rem"]["minutes"]
+                    rem_duration = whole_minutes_to_time(
+                        summary["rem"]["minutes"]
                     )
-                    wake_after_sleep_onset_duration = minutes_to_time(
+                    wake_after_sleep_onset_duration = whole_minutes_to_time(
                         item["minutesAwake"]
                     )
-                    number_of_awakenings = item["levels"]["summary"]["wake"][
-                        "count"
-                    ]
+                    number_of_awakenings = summary["wake"]["count"]
                     sleep_efficiency = item["efficiency"]
                     hypnogram = generate_dreem_hypnogram(
                         item["levels"]["data"]
                     )
 
-                    writer.writerow([
+                    rows.append((
                         start_time,
                         stop_time,
                         sleep_onset_duration,
@@ -324,8 +367,9 @@ def write_to_dreem(args, json_files):
                         wake_after_sleep_onset_duration,
                         number_of_awakenings,
                         sleep_efficiency,
-                        f"[{','.join(hypnogram)}]",
-                    ])
+                        f"[{','.join(hypnogram.tolist())}]",
+                    ))
+                writer.writerows(rows)
 
 
 def get_fitbit_path(s) -> Path:
@@ -345,7 +389,7 @@ def get_fitbit_path(s) -> Path:
 
 
 def process_date_arg(datestring: str, argtype: str = "file") -> date:
-    datematch = re.match(r"(\d{4})-(\d{1,2})-(\d{1,2})", datestring)
+    datematch = _ARG_DATE_RE.match(datestring)
     if datematch is None:
         raise argparse.ArgumentError(
             f"Invalid {argtype} date argument '{datestring}', must match YYYY-M-D format"
@@ -2,16 +2,31 @@ import sys
 import datetime
 from cryptography import x509
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
 from pathlib import Path
 
 CERT_PATH = Path.cwd().joinpath("server.crt")
 KEY_PATH = Path.cwd().joinpath("server.key")
 
 
-def create_cert():
-    private_key = rsa.generate_private_key(
-        public_exponent=65537, key_size=2048
+def load_or_generate_key(fast: bool = False, reuse_key: bool = False):
+    """Returns the existing server.key if reuse is requested, else a new key."""
+    if reuse_key and KEY_PATH.exists():
+        return serialization.load_pem_private_key(
+            KEY_PATH.read_bytes(), password=None
+        )
+    if fast:
+        return ed25519.Ed25519PrivateKey.generate()
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def create_cert(fast: bool = False, reuse_key: bool = False):
+    private_key = load_or_generate_key(fast, reuse_key)
+    # Ed25519 signs with its own built-in hash and rejects an explicit one
+    algorithm = (
+        None
+        if isinstance(private_key, ed25519.Ed25519PrivateKey)
+        else hashes.SHA256()
     )
 
     cert = (
@@ -25,7 +40,7 @@ def create_cert():
             datetime.datetime.now(datetime.timezone.utc)
             + datetime.timedelta(days=3650)
         )
-        .sign(private_key, hashes.SHA256())
+        .sign(private_key, algorithm)
     )
 
     cert_pem = cert.public_bytes(serialization.Encoding.PEM)
@@ -43,13 +58,16 @@ def create_cert():
 
 def print_help():
     """Prints the help message for the script."""
-    print("Usage: python create_cert.py")
+    print("Usage: python create_cert.py [--fast] [--reuse-key]")
     print("\nCreates a self-signed certificate and a private key.")
     print("The files will be saved as 'server.crt' and 'server.key' in the current directory.")
+    print("\nOptions:")
+    print("  --fast       Generate an Ed25519 key instead of 2048-bit RSA")
+    print("  --reuse-key  Sign with the existing server.key if there is one")
 
 
 if __name__ == "__main__":
     if "-h" in sys.argv:
         print_help()
         sys.exit(0)
-    create_cert()
\ No newline at end of file
+    create_cert(fast="--fast" in sys.argv, reuse_key="--reuse-key" in sys.argv)
\ No newline at end of file
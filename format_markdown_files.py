@@ -1,20 +1,34 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Iterator
 from pathlib import Path
 import subprocess
 
+CONFIG_PATH = "C:/Users/ashro/.claude/hooks/.markdown-format.json"
+
+
+def format_markdown_file(md_file: Path) -> None:
+    subprocess.run([
+        "markdown-format.cmd",
+        "-use-config",
+        CONFIG_PATH,
+        "--replace",
+        "--file",
+        str(md_file),
+    ])
+    print(f"Formatted: {md_file}")
+
+
+def iter_markdown_files(root_dir: Path) -> Iterator[Path]:
+    for dirpath, _, filenames in os.walk(root_dir):
+        for filename in filenames:
+            if filename.lower().endswith(".md"):
+                yield Path(dirpath) / filename
+
 
 def format_markdown_files(root_dir: Path = Path.cwd()) -> None:
-    config_path = "C:/Users/ashro/.claude/hooks/.markdown-format.json"
-
-    for md_file in root_dir.rglob("*.md"):
-        subprocess.run([
-            "markdown-format.cmd",
-            "-use-config",
-            config_path,
-            "--replace",
-            "--file",
-            str(md_file),
-        ])
-        print(f"Formatted: {md_file}")
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(executor.map(format_markdown_file, iter_markdown_files(root_dir)))
 
 
 if __name__ == "__main__":
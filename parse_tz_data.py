@@ -1,29 +1,52 @@
 # /// script
-# dependencies = ["requests"]
+# dependencies = ["orjson", "rapidgzip", "requests"]
 # ///
 
 import argparse
-import atexit
 import contextlib
-import ftplib
+import io
 import logging
 import json
-import re
+import os
+import shutil
 import tempfile
-import tarfile
 from collections.abc import Generator, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import BinaryIO
 from urllib.parse import urlparse
 
-import requests
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
 
 
 TZ_DATA_URL = "ftp://ftp.iana.org/tz/tzdata-latest.tar.gz"
 DEFAULT_OUTPUT_FILE = Path.cwd() / "tz_data.json"
+DOWNLOAD_BLOCK_SIZE = 1 << 20
+DOWNLOAD_CONNECTIONS = 4
 
 logger = logging.getLogger(__name__)
-to_cleanup = []
+
+
+def _is_valid_name(name: str) -> bool:
+    """Check if a file name or '/' separated archive path is a region file.
+
+    Args:
+        name (str): The file name or archive member path to check.
+
+    Returns:
+        bool: True if the name is a valid timezone region file, False otherwise.
+    """
+    base = name.rsplit("/", 1)[-1]
+    return base.islower() and "." not in base
 
 
 def is_valid_file(filename: Path) -> bool:
@@ -35,7 +58,7 @@ def is_valid_file(filename: Path) -> bool:
     Returns:
         bool: True if the file is a valid timezone region file, False otherwise.
     """
-    return filename.name.islower() and "." not in filename.name
+    return _is_valid_name(filename.name)
 
 
 def parse_timezones(filename: Path) -> Iterator[tuple[str, str]]:
@@ -51,10 +74,14 @@ def parse_timezones(filename: Path) -> Iterator[tuple[str, str]]:
     in_zone: bool = False
     zone: str = ""
 
-    for data_line in filename.open("r", encoding="utf-8"):
+    for data_line in filename.read_text(encoding="utf-8").splitlines():
+        # drop comments, keeping any data in front of an inline one
+        hash_pos = data_line.find("#")
+        if hash_pos >= 0:
+            data_line = data_line[:hash_pos]
         line = data_line.strip()
 
-        if "#" in line or not line:
+        if not line:
             continue
 
         if line.startswith("Zone"):
@@ -62,37 +89,68 @@ def parse_timezones(filename: Path) -> Iterator[tuple[str, str]]:
             in_zone = True
 
         elif in_zone:
-            if not re.search(r"\b\d{4}\b", line):
+            # a four digit year token marks an UNTIL column, so the zone
+            # continues past this line
+            tokens = line.split()
+            if not any(len(tok) == 4 and tok.isdigit() for tok in tokens):
                 in_zone = False
-                offset = line.split()[0]
-                logger.debug(f"Zone: {zone}, Offset: {offset}")
-                yield zone, offset
+                yield zone, tokens[0]
+
+
+def parse_timezone_file(filename: Path) -> dict[str, str]:
+    """Parse a single timezone region file into zone offsets.
+
+    Args:
+        filename (Path): The path to the timezone region file.
+
+    Returns:
+        dict[str, str]: A dictionary mapping zone names to their offsets.
+    """
+    return dict(parse_timezones(filename))
 
 
 def parse_timezone_data(tz_dir: Path) -> dict[str, str]:
     """Parse timezone region files and return zone offsets.
 
+    The region files are independent, so they are parsed in parallel worker
+    processes and their zones merged in directory order.
+
     Args:
         tz_dir (Path): The path to the timezone region directory.
 
     Returns:
         dict[str, str]: A dictionary mapping zone names to their offsets.
     """
-    zones = []
-    for file in tz_dir.iterdir():
-        if is_valid_file(file):
-            logger.info(f"Parsing timezone region file: {file}")
-
-            zones.extend(
-                (zone, offset) for zone, offset in parse_timezones(file)
-            )
-    return dict(sorted(zones))
+    files = [file for file in tz_dir.iterdir() if _is_valid_name(file.name)]
+    for file in files:
+        logger.info(f"Parsing timezone region file: {file}")
+
+    zones: dict[str, str] = {}
+    with ProcessPoolExecutor() as executor:
+        for file_zones in executor.map(parse_timezone_file, files):
+            # workers do not inherit the logging setup under spawn, so the
+            # per-zone debug output is emitted here
+            for zone, offset in file_zones.items():
+                logger.debug(f"Zone: {zone}, Offset: {offset}")
+            zones.update(file_zones)
+    return zones
 
 
 def write_results(results: dict[str, str], output_file: Path) -> None:
-    """Write results to a JSON file."""
-    with output_file.open("w") as f:
-        json.dump(results, f, indent=2)
+    """Write results to a JSON file, sorted by zone name."""
+    if orjson is None:
+        with output_file.open("w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+    else:
+        output_file.write_bytes(
+            orjson.dumps(
+                results,
+                option=orjson.OPT_INDENT_2
+                | orjson.OPT_SORT_KEYS
+                | orjson.OPT_APPEND_NEWLINE,
+            )
+        )
 
     logger.info(f"Results written to {output_file}")
 
@@ -119,44 +177,48 @@ def setup_logging(args: argparse.Namespace) -> None:
 
 
 # download and extract timezone data
-def filter_file(
-    member: tarfile.TarInfo, destination: Path
-) -> tarfile.TarInfo | None:
-    """
-    Filter out files that are not timezone region files and apply data filter.
-
-    Args:
-        member (tarfile.TarInfo): The member to filter.
-        destination (Path): The destination path.
-
-    Returns:
-        tarfile.TarInfo | None: The filtered member or None if the member is not a valid file.
-    """
-    return (
-        tarfile.data_filter(member, destination)
-        if is_valid_file(Path(member.name))
-        else None
-    )
-
-
-class LoggedTarFile(tarfile.TarFile):
-    """Override debug method to logger for tarfile.TarFile."""
+# requests, tarfile and ftplib are imported where they are used, so --help,
+# argument errors and --dir runs don't pay for importing them
+def extract_tarfile(fileobj: BinaryIO, log_level: int) -> Path:
+    """Extract a tar.gz stream to a temporary directory as it is read."""
+    import tarfile
 
-    def _dbg(self, level, msg) -> None:
-        if level <= self.debug:
-            message = f"tarfile: {msg}" if level == 1 else msg
-            logger.debug(message)
+    class LoggedTarFile(tarfile.TarFile):
+        """Override debug method to logger for tarfile.TarFile."""
 
+        def _dbg(self, level, msg) -> None:
+            if level <= self.debug:
+                message = f"tarfile: {msg}" if level == 1 else msg
+                logger.debug(message)
 
-def extract_tarfile(tar_file: Path, log_level: int) -> Path:
-    """Extract a tar.gz file to a temporary directory."""
     temp_dir = Path(tempfile.mkdtemp(prefix="tzdata_"))
     debug_level: int = 3 if log_level > 0 else 0
 
+    # rapidgzip decodes deflate blocks on all cores, but needs to seek, so
+    # network streams keep using tarfile's own single threaded gunzip
+    parallel_gunzip: bool = rapidgzip is not None and fileobj.seekable()
+    if parallel_gunzip:
+        logger.debug("Decompressing timezone data with rapidgzip")
+        fileobj = rapidgzip.open(fileobj, parallelization=os.cpu_count())
+
     tar_func = LoggedTarFile if debug_level > 0 else tarfile.TarFile
+    # tarfile.open already reads from the stream, so it can fail before
+    # there is a tar to close
+    tar = None
     try:
-        with tar_func.open(tar_file, "r:gz", debug=debug_level) as tar:
-            tar.extractall(path=temp_dir, filter=filter_file)
+        with tar_func.open(
+            fileobj=fileobj,
+            mode="r|" if parallel_gunzip else "r|gz",
+            bufsize=DOWNLOAD_BLOCK_SIZE,
+            debug=debug_level,
+        ) as tar:
+            # only region files are written out; the other members are
+            # skipped as the stream moves past them
+            for member in tar:
+                if _is_valid_name(member.name):
+                    tar.extract(
+                        member, path=temp_dir, filter=tarfile.data_filter
+                    )
         return temp_dir
 
     except tarfile.TarError as e:
@@ -167,47 +229,130 @@ def extract_tarfile(tar_file: Path, log_level: int) -> Path:
         raise
 
     finally:
-        if not tar.fileobj.closed:
+        if tar is not None and not tar.fileobj.closed:
             logger.debug("Tar fileobj still open, closing")
             tar.fileobj.close()
-        if not tar.closed:
+        if tar is not None and not tar.closed:
             logger.debug("Tar file still open, closing")
             tar.close()
+        if parallel_gunzip:
+            fileobj.close()
 
 
-def download_http(
-    database_url: str,
-) -> Path:
-    """Download a file from an HTTP server to a temporary file."""
-    logger.info(f"Downloading timezone data from {database_url}")
-    download_start = datetime.now()
+def download_range(database_url: str, buffer: memoryview, start: int) -> None:
+    """Download one byte range of a file from an HTTP server into buffer."""
+    import requests
 
-    try:
-        response = requests.get(database_url, stream=True)
+    end = start + len(buffer) - 1
+    headers = {"Range": f"bytes={start}-{end}", "Accept-Encoding": "identity"}
+    with requests.get(database_url, headers=headers, stream=True) as response:
         response.raise_for_status()
+        if response.status_code != 206:
+            raise requests.exceptions.RequestException(
+                f"Server ignored the request for bytes {start}-{end}"
+            )
+        received = 0
+        while received < len(buffer):
+            read = response.raw.readinto(buffer[received:])
+            if not read:
+                raise requests.exceptions.RequestException(
+                    f"Bytes {start}-{end} ended after {received} bytes"
+                )
+            received += read
+
+
+def download_http_ranges(database_url: str) -> io.BytesIO | None:
+    """Download a file over parallel HTTP range requests into memory.
+
+    Returns None if the server rejects the HEAD probe or does not advertise
+    byte range support or the file size, so the caller can fall back to a
+    single streamed request.
+    """
+    import requests
 
-        download_file = Path(
-            tempfile.NamedTemporaryFile(suffix=".tar.gz", delete=False).name
+    try:
+        head = requests.head(
+            database_url,
+            headers={"Accept-Encoding": "identity"},
+            allow_redirects=True,
         )
-        with download_file.open("wb") as opened:
-            for chunk in response.iter_content(chunk_size=8192):
-                opened.write(chunk)
+    except requests.exceptions.RequestException:
+        logger.debug("HEAD request failed, not using ranged download")
+        return None
+    if not head.ok:
+        logger.debug(
+            f"HEAD request returned {head.status_code}, "
+            "not using ranged download"
+        )
+        return None
+    size = int(head.headers.get("Content-Length", 0))
+    if head.headers.get("Accept-Ranges") != "bytes" or not size:
+        return None
+
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    segment = -(-size // DOWNLOAD_CONNECTIONS)
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_CONNECTIONS) as executor:
+        futures = [
+            executor.submit(
+                download_range,
+                head.url,
+                view[start : start + segment],
+                start,
+            )
+            for start in range(0, size, segment)
+        ]
+        for future in futures:
+            future.result()
+    view.release()
+    return io.BytesIO(buffer)
+
+
+def download_and_extract_http(database_url: str, log_level: int) -> Path:
+    """Extract a tar.gz from an HTTP server while it is being downloaded."""
+    import requests
+    import urllib3
+
+    logger.info(f"Downloading timezone data from {database_url}")
+    download_start = datetime.now()
+
+    try:
+        archive = download_http_ranges(database_url)
+        if archive is not None:
+            logger.debug(
+                f"Downloaded timezone data over {DOWNLOAD_CONNECTIONS} "
+                "ranged connections"
+            )
+            temp_dir = extract_tarfile(archive, log_level)
+        else:
+            with requests.get(database_url, stream=True) as response:
+                response.raise_for_status()
+                # undo any Content-Encoding so tarfile sees the gzip stream
+                response.raw.decode_content = True
+                temp_dir = extract_tarfile(response.raw, log_level)
 
         download_time = datetime.now() - download_start
         logger.debug(
-            "Downloaded timezone data in {} seconds".format(
+            "Downloaded and extracted timezone data in {} seconds".format(
                 download_time.total_seconds()
             )
         )
-        return download_file
+        return temp_dir
 
-    except requests.exceptions.RequestException as e:
+    # tarfile reads response.raw itself, so errors in the body surface as
+    # urllib3 exceptions rather than requests ones
+    except (
+        requests.exceptions.RequestException,
+        urllib3.exceptions.HTTPError,
+    ) as e:
         logger.error("Failed to download http data", exc_info=True)
         raise RuntimeError(f"Failed to download http data: {e}")
 
 
 def download_ftp(database_url: str, log_level: int) -> Path:
     """Download a file from an FTP server to a temporary file."""
+    import ftplib
+
     parsed_url = urlparse(database_url)
     host = parsed_url.hostname
     file = parsed_url.path
@@ -222,7 +367,9 @@ def download_ftp(database_url: str, log_level: int) -> Path:
             ftp.set_debuglevel(level=log_level)
             ftp.login()
             with download_file.open("wb") as opened:
-                ftp.retrbinary(f"RETR {file}", opened.write)
+                ftp.retrbinary(
+                    f"RETR {file}", opened.write, blocksize=DOWNLOAD_BLOCK_SIZE
+                )
             if not opened.closed:
                 logger.debug("Download file still open, closing")
                 opened.close()
@@ -240,32 +387,6 @@ def download_ftp(database_url: str, log_level: int) -> Path:
         raise RuntimeError(f"Failed to download FTP data: {e}")
 
 
-def _cleanup() -> None:
-    """Cleanup temporary files and directories."""
-    file: Path = to_cleanup[0]
-    directory: Path = to_cleanup[1]
-    if file and file.exists():
-        try:
-            file.unlink(missing_ok=True)
-            logger.debug(f"Removed {file}")
-        except PermissionError as e:
-            logger.warning(f"Failed to remove {file}: {e}")
-        except FileNotFoundError:
-            pass
-
-    if directory and directory.exists():
-        logger.debug(f"Removing {directory}")
-        try:
-            for item in directory.iterdir():
-                item.unlink(missing_ok=True)
-            directory.rmdir()
-            logger.debug(f"Removed {directory}")
-        except PermissionError as e:
-            logger.warning(f"Failed to remove {directory}: {e}")
-        except FileNotFoundError:
-            pass
-
-
 @contextlib.contextmanager
 def get_timezone_data(
     database_url: str, log_level: int
@@ -275,15 +396,22 @@ def get_timezone_data(
     scheme: str = urlparse(database_url).scheme
     logger.debug(f"URL is {database_url}, using {scheme} downloader")
 
-    download_file: Path = (
-        download_ftp(database_url, log_level)
-        if scheme == "ftp"
-        else download_http(database_url)
-    )
-    to_cleanup.append(download_file)
-    temp_dir: Path = extract_tarfile(download_file, log_level)
-    yield temp_dir
-    to_cleanup.append(temp_dir)
+    if scheme == "ftp":
+        download_file: Path = download_ftp(database_url, log_level)
+        try:
+            with download_file.open("rb") as opened:
+                temp_dir: Path = extract_tarfile(opened, log_level)
+        finally:
+            download_file.unlink(missing_ok=True)
+            logger.debug(f"Removed {download_file}")
+    else:
+        temp_dir = download_and_extract_http(database_url, log_level)
+
+    try:
+        yield temp_dir
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        logger.debug(f"Removed {temp_dir}")
 
 
 # argument parsing
@@ -398,7 +526,6 @@ def create_parser() -> argparse.Namespace:
 
 def main() -> None:
     """Main entry point for the script."""
-    atexit.register(_cleanup)
     args = create_parser()
 
     setup_logging(args)
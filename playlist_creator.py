@@ -1,36 +1,73 @@
 import argparse
+import functools
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from ytmusicapi import YTMusic
-
 scripts_env_path = Path("C:/Users/ashro/.scripts/.env")
+# songs sent per add_playlist_items request
+PLAYLIST_BATCH_SIZE = 100
+# searches are network bound, so run this many at once
+SEARCH_WORKERS = 16
+
 
-    
-yt = YTMusic("C:/Users/ashro/.scripts/.env/headers_auth.json")
+def read_songs(playlist_txt: Path) -> Iterator[tuple[str, str]]:
+    """Yield (title, artist) for each 'title - artist' line of the file."""
+    songs = playlist_txt.expanduser().resolve()
+    with songs.open(encoding="utf-8") as f:
+        for line in f:
+            if " - " in line:
+                title, artist = line.strip().split(" - ", 1)
+                yield title, artist
+
+
+@functools.lru_cache(maxsize=1024)
+def _search_song(yt, title: str, artist: str) -> str | None:
+    """Return the top song match's videoId, reusing it for repeated songs."""
+    results = yt.search(f"{title} {artist}", filter="songs")
+    return results[0]["videoId"] if results else None
 
 
 def create_playlist(
-    title: str, description: str, playlist_txt: Path, privacy: str = "PUBLIC"
+    title: str,
+    description: str,
+    songs: Iterable[tuple[str, str]],
+    privacy: str = "PUBLIC",
 ) -> None:
+    # imported here so --help and argument errors skip the client's setup
+    from ytmusicapi import YTMusic
+
+    yt = YTMusic("C:/Users/ashro/.scripts/.env/headers_auth.json")
     pl_id = yt.create_playlist(title, description, privacy=privacy)
 
-    songs = playlist_txt.expanduser().resolve()
-    with songs.open(encoding="utf-8") as f:
-        song_lines = [line.strip() for line in f if " - " in line]
+    def search(song: tuple[str, str]) -> tuple[str, str, str | None]:
+        song_title, artist = song
+        return song_title, artist, _search_song(yt, song_title, artist)
+
+    video_ids = []
+    with ThreadPoolExecutor(max_workers=SEARCH_WORKERS) as executor:
+        # map yields in submission order, keeping the playlist in file order
+        for song_title, artist, video_id in executor.map(search, songs):
+            if video_id:
+                video_ids.append(video_id)
+            else:
+                print(f"❌ No results found for: {song_title} by {artist}")
 
-    for line in song_lines:
-        title, artist = line.split(" - ", 1)
-        results = yt.search(f"{title} {artist}", filter="songs")
-        if results:
-            yt.add_playlist_items(pl_id, [results[0]["videoId"]])
-        else:
-            print(f"❌ No results found for: {title} by {artist}")
+    for start in range(0, len(video_ids), PLAYLIST_BATCH_SIZE):
+        yt.add_playlist_items(
+            pl_id, video_ids[start : start + PLAYLIST_BATCH_SIZE]
+        )
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("title", help="Playlist title")
     parser.add_argument("description", help="Playlist description")
-    parser.add_argument("playlist-file", help="TXT file with list of songs", type=Path)
+    parser.add_argument(
+        "playlist_file",
+        metavar="playlist-file",
+        help="TXT file with list of songs",
+        type=Path,
+    )
     parser.add_argument(
         "--privacy",
         help="playlist privacy setting",
@@ -38,7 +75,12 @@ def main():
         default="PUBLIC",
     )
     args = parser.parse_args()
-    create_playlist(args.title, args.playlist, args.privacy)
+    create_playlist(
+        args.title,
+        args.description,
+        read_songs(args.playlist_file),
+        args.privacy,
+    )
 
 
 if __name__ == "__main__":
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 
 import argparse
+import functools
+import os
 import platform
+import shlex
 import subprocess
 import sys
 from enum import Enum
@@ -21,6 +24,7 @@ DOCKER_NOT_FOUND_ERROR = (
 )
 
 
+@functools.lru_cache(maxsize=1)
 def _get_uv_cache_path() -> Path:
     """Get the UV cache directory path based on the operating system."""
     system = platform.system().lower()
@@ -76,14 +80,21 @@ def _build_full_docker_command(
     initial_command: str | None = None,
 ) -> list[str]:
     docker_command = _build_base_docker_command()
-    env_vars: dict[str, str] = {}
 
     # Handle local directory mounting
     if local_dir:
-        env_vars.update(_add_local_directory_mount(docker_command, local_dir))
+        abs_local_dir = _validate_local_directory(local_dir)
+        docker_command.extend([
+            "-v",
+            f"{abs_local_dir}:/tmp/source_project:ro",
+            "-e",
+            "SOURCE_HOST_PATH=/tmp/source_project",
+        ])
+        print(f"Configured to copy local directory: {abs_local_dir}")
     # Handle GitHub repository cloning
     elif github_repo:
-        env_vars.update(_add_github_repo_env(github_repo))
+        docker_command.extend(["-e", f"GITHUB_REPO_URL={github_repo}"])
+        print(f"Configured to clone GitHub repository: {github_repo}")
     else:
         print(
             "No source (local directory or GitHub repo) specified. "
@@ -92,56 +103,22 @@ def _build_full_docker_command(
 
     # Handle optional parameters
     if node_packages:
-        env_vars.update(_add_node_packages_env(node_packages))
+        docker_command.extend(["-e", f"NODE_GLOBAL_PACKAGES={node_packages}"])
+        print(f"Configured to install global Node packages: {node_packages}")
 
     if initial_command:
-        env_vars.update(_add_initial_command_env(initial_command))
+        docker_command.extend(["-e", f"INITIAL_COMMAND={initial_command}"])
+        print(f"Configured to run initial command: '{initial_command}'")
 
-    # Add environment variables and final arguments
-    _add_env_vars_to_command(docker_command, env_vars)
-    docker_command.extend([image_name, start_environment])
+    # Add final arguments
+    docker_command.append(image_name)
+    docker_command.extend(_get_start_environment(start_environment))
 
     print("\nStarting Docker container...")
     print(f"Command: {' '.join(docker_command)}\n")
     return docker_command
 
 
-def _add_local_directory_mount(
-    docker_command: list[str], local_dir: str
-) -> dict[str, str]:
-    """Add local directory mount to Docker command and return env vars."""
-    abs_local_dir = _validate_local_directory(local_dir)
-    docker_command.extend(["-v", f"{abs_local_dir}:/tmp/source_project:ro"])
-    print(f"Configured to copy local directory: {abs_local_dir}")
-    return {"SOURCE_HOST_PATH": "/tmp/source_project"}
-
-
-def _add_github_repo_env(github_repo: str) -> dict[str, str]:
-    """Add GitHub repository environment variable."""
-    print(f"Configured to clone GitHub repository: {github_repo}")
-    return {"GITHUB_REPO_URL": github_repo}
-
-
-def _add_node_packages_env(node_packages: str) -> dict[str, str]:
-    """Add Node.js packages environment variable."""
-    print(f"Configured to install global Node packages: {node_packages}")
-    return {"NODE_GLOBAL_PACKAGES": node_packages}
-
-
-def _add_initial_command_env(initial_command: str) -> dict[str, str]:
-    """Add initial command environment variable."""
-    print(f"Configured to run initial command: '{initial_command}'")
-    return {"INITIAL_COMMAND": initial_command}
-
-
-def _add_env_vars_to_command(
-    docker_command: list[str], env_vars: dict[str, str]
-) -> None:
-    """Add environment variables to Docker command."""
-    for key, value in env_vars.items():
-        docker_command.extend(["-e", f"{key}={value}"])
-
-
 def build_docker_image(image_name: str, dockerfile_path: Path) -> None:
     """
     Builds the Docker image if it doesn't already exist.
@@ -206,7 +183,14 @@ def run_docker_container(
     )
 
     try:
-        subprocess.run(docker_command, check=False)
+        if os.name == "posix":
+            # Replace this process with docker; flush first, as exec discards
+            # anything still sitting in Python's stdout buffer
+            sys.stdout.flush()
+            os.execvp(docker_command[0], docker_command)
+        else:
+            # Windows has no real exec, os.execvp would detach the console
+            subprocess.run(docker_command, check=False)
     except KeyboardInterrupt:
         print("\nContainer stopped by user (Ctrl+C).")
     except FileNotFoundError:
@@ -217,8 +201,10 @@ def run_docker_container(
         sys.exit(1)
 
 
-def _get_start_environment(command: str) -> str:
-    return StartEnvironment[command.upper()].value
+@functools.lru_cache(maxsize=None)
+def _get_start_environment(command: str) -> tuple[str, ...]:
+    """Split the start environment's command line into docker arguments."""
+    return tuple(shlex.split(StartEnvironment[command.upper()].value))
 
 
 def create_parser() -> argparse.Namespace:
@@ -273,7 +259,6 @@ def create_parser() -> argparse.Namespace:
     )
     parser.add_argument(
         "--command",
-        type=_get_start_environment,
         default="bash",
         choices=["bash", "vscode"],
         help=(